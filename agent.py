@@ -1,19 +1,53 @@
 import os
 import uuid
-import json
+import time
+import asyncio
 from datetime import datetime
 from abc import ABC
 import re
 import traceback
+from collections import Counter
+from dataclasses import dataclass, field, asdict
+from typing import Any
+
+import orjson
 
 from tool import Tool
 from model_library.base import *
 
-from logger import get_logger
+from logger import get_logger, LOGS_DIR
 from utils import INSTRUCTIONS_PROMPT, _merge_statistics
 
 agent_logger = get_logger(__name__)
 
+# maximum number of tool calls from a single turn that may run at once
+TOOL_CONCURRENCY_LIMIT = 4
+
+# the agent ends the session by answering with EXIT
+_EXIT_RE = re.compile(r"\bEXIT\b", re.IGNORECASE)
+
+# log formats, arguments are interpolated by logging only if the record is emitted
+_TURN_FMT = "\033[1;34m[TURN %d]\033[0m"
+_TOOL_DONE_FMT = "\033[1;32m[TOOL %d DONE]\033[0m %s"
+_REASONING_FMT = "\033[1;33m[LLM REASONING]\033[0m %s"
+_THINKING_FMT = "\033[1;33m[LLM THINKING]\033[0m %s"
+_BAD_ARGUMENTS_FMT = "Could not parse tool call arguments: %s"
+_SUBMISSION_LIMIT_FMT = "\033[1;31m[SUBMISSION LIMIT REACHED]\033[0m %s"
+_SUBMISSION_INFO_FMT = "\033[1;36m[SUBMISSION INFO]\033[0m Submission #%s - Score: %s - Remaining: %s"
+_EXIT_MSG = "\033[1;31m[EXIT REQUESTED]\033[0m Agent requested exit"
+_USER_INSTRUCTIONS_FMT = "\033[1;34m[USER INSTRUCTIONS]\033[0m %s"
+_MODEL_EXCEPTION_FMT = "\033[1;31m[MODEL EXCEPTION]\033[0m %s"
+_RETRYING_TOOL_CALL_FMT = "\033[1;37m[RETRYING TOOL CALL]\033[0m Removed last message: %s"
+_ERROR_FMT = "\033[1;31m[ERROR]\033[0m %s"
+_TRACEBACK_FMT = "\033[1;31m[traceback]\033[0m %s"
+
+
+def _write_log(log_path: str, metadata: dict):
+    """Write the session metadata to a JSON log file."""
+    with open(log_path, "wb") as f:
+        f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+
+
 class ModelException(Exception):
     """
     Raised on model errors
@@ -31,6 +65,32 @@ class ToolCallException(Exception):
 
     pass
 
+@dataclass(slots=True)
+class ToolCallMetadata:
+    """Record of a single tool call made during a turn."""
+
+    tool_name: str
+    arguments: Any
+    success: bool = False
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class TurnMetadata:
+    """Record of a single turn, converted to a plain dict when the session is merged."""
+
+    query_metadata: QueryResultMetadata
+    tool_calls: list[ToolCallMetadata] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            **self.query_metadata.model_dump(),
+            "tool_calls": [asdict(tool_call) for tool_call in self.tool_calls],
+            "errors": self.errors,
+        }
+
+
 class Agent(ABC):
     def __init__(
         self,
@@ -38,11 +98,37 @@ class Agent(ABC):
         llm: LLM,
         max_turns: int = 20,
         instructions_prompt: str = INSTRUCTIONS_PROMPT,
+        tool_concurrency_limit: int = TOOL_CONCURRENCY_LIMIT,
     ):
         self.tools = tools
         self.llm = llm
         self.max_turns = max_turns
         self.instructions_prompt = instructions_prompt
+        self._tool_semaphore = asyncio.Semaphore(tool_concurrency_limit)
+
+        # the tool set is fixed for the agent's lifetime, build the definitions once
+        self._tool_reprs = [tool.get_tool_repr() for tool in self.tools.values()]
+        self._tool_names_str = repr(list(self.tools))
+
+    async def _call_tool(self, index: int, tool_name: str, arguments: dict) -> tuple[int, dict]:
+        """
+        Call a tool, waiting for a free slot if too many are already running.
+
+        Args:
+            index (int): Position of the call in the turn's tool calls
+            tool_name (str): Name of the tool to call
+            arguments (dict): Parsed tool call arguments
+
+        Returns:
+            tuple[int, dict]: The index and the tool result with 'success' and 'result' keys
+        """
+        async with self._tool_semaphore:
+            try:
+                tool_result = await self.tools[tool_name](arguments)
+            except Exception as e:
+                tool_result = {"success": False, "result": str(e)}
+        agent_logger.info(_TOOL_DONE_FMT, index, tool_name)
+        return index, tool_result
 
     async def _process_turn(self, turn_count, data_storage, metadata):
         """
@@ -56,15 +142,16 @@ class Agent(ABC):
         Returns:
             tuple: (final_answer, turn_metadata, should_continue)
         """
-        agent_logger.info(f"\033[1;34m[TURN {turn_count}]\033[0m")
+        agent_logger.info(_TURN_FMT, turn_count)
 
         # Get response from LLM
         try:
             response: QueryResult = await self.llm.query(
-                input=self.messages, tools=[tool.get_tool_repr() for tool in self.tools.values()]
+                input=self.messages, tools=self._tool_reprs
             )
         except Exception as e:
             raise ModelException(e)
+        metadata["api_calls_count"] += 1
 
         # record response
         # TODO: make this less hacky
@@ -75,116 +162,159 @@ class Agent(ABC):
         reasoning_text = response.reasoning
         tool_calls: list[ToolCall] = response.tool_calls
 
-        # record turn metadata
-        turn_metadata = response.metadata.model_dump()
-        turn_metadata['tool_calls'] = []
-        turn_metadata['errors'] = []
+        # record turn metadata, the query metadata is dumped once when the session is merged
+        turn_metadata = TurnMetadata(query_metadata=response.metadata)
 
         # Log the thinking content if available
         if reasoning_text:
-            agent_logger.info(f"\033[1;33m[LLM REASONING]\033[0m {reasoning_text}")
+            agent_logger.info(_REASONING_FMT, reasoning_text)
 
         if response_text:
-            agent_logger.info(f"\033[1;33m[LLM THINKING]\033[0m {response_text}")
+            agent_logger.info(_THINKING_FMT, response_text)
 
         if tool_calls:
+            # parse every call up front so a malformed one is retried before any tool runs
+            parsed_calls = []
             for tool_call in tool_calls:
-                tool_name = tool_call.name
-
                 # unpacks tool call arguments
                 arguments = tool_call.args
                 if isinstance(arguments, str):
                     try:
-                        arguments = json.loads(arguments)
-                    except json.JSONDecodeError:
-                        agent_logger.warning(f"Could not parse tool call arguments: {arguments}")
+                        arguments = orjson.loads(arguments)
+                    except orjson.JSONDecodeError:
+                        agent_logger.warning(_BAD_ARGUMENTS_FMT, arguments)
                         raise ToolCallException(f"Could not parse tool call arguments: {arguments}")
-
+                parsed_calls.append((tool_call, arguments))
+
+            # run all known tools concurrently and slot each result back at its call's position;
+            # tasks are created up front so the tools start in call order (submission numbering)
+            tool_tasks = [
+                asyncio.create_task(self._call_tool(index, tool_call.name, arguments))
+                for index, (tool_call, arguments) in enumerate(parsed_calls)
+                if tool_call.name in self.tools
+            ]
+            tool_results = [None] * len(parsed_calls)
+            try:
+                for next_result in asyncio.as_completed(tool_tasks):
+                    index, tool_result = await next_result
+                    tool_results[index] = tool_result
+            finally:
+                # a cancelled or failed turn must not leave tools running (and holding their slots)
+                pending_tasks = [task for task in tool_tasks if not task.done()]
+                for task in pending_tasks:
+                    task.cancel()
+                if pending_tasks:
+                    await asyncio.gather(*pending_tasks, return_exceptions=True)
+
+            # tool results are added to the history in one batch once the turn is processed
+            new_messages = []
+            submission_limit_reached = False
+            for (tool_call, arguments), tool_result in zip(parsed_calls, tool_results):
+                tool_name = tool_call.name
 
                 # Track tool call in turn metadata
-                tool_call_metadata = {
-                    "tool_name": tool_name,
-                    "arguments": arguments,
-                    "success": False,
-                    "error": None,
-                }
+                tool_call_metadata = ToolCallMetadata(tool_name=tool_name, arguments=arguments)
                 if tool_name not in self.tools:
-                    error_msg = f"Tool '{tool_name}' not found. Available tools: {list(self.tools.keys())}"
+                    error_msg = f"Tool '{tool_name}' not found. Available tools: {self._tool_names_str}"
 
                     # Update error tracking
-                    tool_call_metadata["error"] = error_msg
-                    turn_metadata["errors"].append(error_msg)
+                    tool_call_metadata.error = error_msg
+                    turn_metadata.errors.append(error_msg)
+                    metadata["error_count"] += 1
 
                     # Add error to messages
                     tool_result = ToolResult(
                         tool_call=tool_call,
                         result=error_msg
                     )
-                    self.messages.append(tool_result)
+                    new_messages.append(tool_result)
                     continue
 
-                tool_result = await self.tools[tool_name](arguments)
-
                 if tool_result["success"]:
                     # Add tool result to messages
-                    tool_call_metadata["success"] = True
+                    tool_call_metadata.success = True
                     
-                    # Special handling for submission tool
-                    if tool_name == "submission":
+                    # Special handling for submission tool, only results that look like a JSON object are parsed
+                    result_text = tool_result["result"]
+                    if tool_name == "submission" and isinstance(result_text, str) and result_text.lstrip().startswith("{"):
                         try:
                             # Parse the submission result
-                            result_data = json.loads(tool_result["result"])
+                            result_data = orjson.loads(result_text)
                             if isinstance(result_data, dict):
-                                # Update metadata with submission information
+                                # Update metadata with submission information. Submissions in one turn run
+                                # concurrently and finish in any order, so keep the highest count seen
                                 if "submission_count" in result_data:
-                                    metadata["submission_count"] = result_data["submission_count"]
+                                    metadata["submission_count"] = max(
+                                        metadata["submission_count"], result_data["submission_count"]
+                                    )
                                 
-                                # Track best scores from submission
+                                # Track best scores from submission, each result holds the best scores as of
+                                # when it finished, so they are merged per subtask instead of overwritten
                                 if "best_subtask_scores" in result_data:
-                                    metadata["best_subtask_scores"] = result_data["best_subtask_scores"]
+                                    best_scores = dict(metadata["best_subtask_scores"] or {})
+                                    for subtask, score in result_data["best_subtask_scores"].items():
+                                        if subtask not in best_scores or score > best_scores[subtask]:
+                                            best_scores[subtask] = score
+                                    metadata["best_subtask_scores"] = best_scores
                                     metadata["has_submissions"] = True
                                 
                                 # Check if maximum submissions reached
-                                if "error" in result_data and "Maximum submissions" in result_data["error"]:
+                                submission_error = result_data.get("error")
+                                if submission_error and "Maximum submissions" in submission_error:
                                     metadata["max_submissions_reached"] = True
-                                    agent_logger.info(f"\033[1;31m[SUBMISSION LIMIT REACHED]\033[0m {result_data['error']}")
+                                    agent_logger.info(_SUBMISSION_LIMIT_FMT, submission_error)
                                     
-                                    turn_metadata["tool_calls"].append(tool_call_metadata)
+                                    turn_metadata.tool_calls.append(tool_call_metadata)
+                                    metadata["tool_usage"][tool_name] += 1
+                                    metadata["tool_calls_count"] += 1
                                     
-                                    # Exit due to submission limit
-                                    return None, turn_metadata, False
+                                    # the other calls of the batch have already run, so they are still
+                                    # recorded before the turn exits due to the submission limit
+                                    submission_limit_reached = True
+                                    continue
                                 
                                 # Log submission information
-                                submission_info = f"Submission #{result_data.get('submission_count', '?')} - Score: {result_data.get('total_score', '?')} - Remaining: {result_data.get('submissions_remaining', '?')}"
-                                agent_logger.info(f"\033[1;36m[SUBMISSION INFO]\033[0m {submission_info}")
-                        except (json.JSONDecodeError, TypeError):
+                                agent_logger.info(
+                                    _SUBMISSION_INFO_FMT,
+                                    result_data.get("submission_count", "?"),
+                                    result_data.get("total_score", "?"),
+                                    result_data.get("submissions_remaining", "?"),
+                                )
+                        except (orjson.JSONDecodeError, TypeError):
                             # If we can't parse the result, continue normally
                             pass
                 else:
-                    tool_call_metadata["error"] = tool_result["result"]
-                    turn_metadata["errors"].append(tool_result["result"])
+                    tool_call_metadata.error = tool_result["result"]
+                    turn_metadata.errors.append(tool_result["result"])
+                    metadata["error_count"] += 1
 
                 tool_result = ToolResult(
                     tool_call=tool_call,
                     result=tool_result["result"]
                 )
-                self.messages.append(tool_result)
+                new_messages.append(tool_result)
 
                 # Add tool call metadata to turn
-                turn_metadata["tool_calls"].append(tool_call_metadata)
+                turn_metadata.tool_calls.append(tool_call_metadata)
+                metadata["tool_usage"][tool_name] += 1
+                metadata["tool_calls_count"] += 1
+
+            self.messages.extend(new_messages)
+
+            if submission_limit_reached:
+                # Exit due to submission limit
+                return None, turn_metadata, False
 
         else:
             # Get text response when there are no tool calls
 
             # Use regex to check for "EXIT" pattern
-            exit_pattern = re.compile(r"\bEXIT\b", re.IGNORECASE)
-
-            if isinstance(response_text, str) and exit_pattern.search(response_text):
+            if isinstance(response_text, str) and _EXIT_RE.search(response_text):
                 # Agent requested to exit
-                agent_logger.info(f"\033[1;31m[EXIT REQUESTED]\033[0m Agent requested exit")
+                agent_logger.info(_EXIT_MSG)
                 return None, turn_metadata, False
             else:
-                agent_logger.info(f"\033[1;33m[LLM THINKING]\033[0m {response_text}")
+                agent_logger.info(_THINKING_FMT, response_text)
 
         return None, turn_metadata, True
 
@@ -201,6 +331,7 @@ class Agent(ABC):
         """
         # Initialize metadata
         session_id = session_id or str(uuid.uuid4())
+        start = time.monotonic()
         metadata = {
             "session_id": session_id,
             "model": self.llm.model_name,
@@ -214,7 +345,7 @@ class Agent(ABC):
                 "total_tokens": 0,
             },
             "turns": [],
-            "tool_usage": {},
+            "tool_usage": Counter(),
             "tool_calls_count": 0,
             "api_calls_count": 0,
             "error_count": 0,
@@ -233,11 +364,12 @@ class Agent(ABC):
         initial_message = TextInput(
             text = initial_prompt
         )
+        # the history is only ever appended to (or has its last item retried), so every
+        # query shares the previous one's prefix and providers can serve it from their
+        # prompt cache; do not rewrite earlier items
         self.messages: list[InputItem] = [initial_message]
 
-        agent_logger.info(
-            f"\033[1;34m[USER INSTRUCTIONS]\033[0m {initial_prompt}"
-        )
+        agent_logger.info(_USER_INSTRUCTIONS_FMT, initial_prompt)
 
         turn_count = 0
 
@@ -252,22 +384,28 @@ class Agent(ABC):
                 # Add turn metadata to session metadata
                 metadata["turns"].append(turn_metadata)
 
+                # Keep the session token totals up to date as turns complete
+                total_tokens = metadata["total_tokens"]
+                total_tokens["prompt_tokens"] += turn_metadata.query_metadata.in_tokens
+                total_tokens["completion_tokens"] += turn_metadata.query_metadata.out_tokens
+                total_tokens["total_tokens"] = total_tokens["prompt_tokens"] + total_tokens["completion_tokens"]
+
             # Handle DoNotRetryException
             except ModelException as e:
-                agent_logger.critical(f"\033[1;31m[MODEL EXCEPTION]\033[0m {e}")
+                agent_logger.critical(_MODEL_EXCEPTION_FMT, e)
                 agent_l
                 should_continue = False
 
             # for malformed tool calls
             except ToolCallException:
                 last_message = self.messages.pop(-1)
-                agent_logger.warning(f"\033[1;37m[RETRYING TOOL CALL]\033[0m Removed last message: {last_message}")
+                agent_logger.warning(_RETRYING_TOOL_CALL_FMT, last_message)
 
 
             except Exception as e:
                 # Log the error
-                agent_logger.error(f"\033[1;31m[ERROR]\033[0m {e}")
-                agent_logger.error(f"\033[1;31m[traceback]\033[0m {traceback.format_exc()}")
+                agent_logger.error(_ERROR_FMT, e)
+                agent_logger.error(_TRACEBACK_FMT, traceback.format_exc())
 
                 # Explain the error to the agent and give them a chance to recover
                 error_message = TextInput(
@@ -284,6 +422,7 @@ class Agent(ABC):
 
         # Finalize session metadata
         metadata["end_time"] = datetime.now().isoformat()
+        metadata["total_duration_seconds"] = time.monotonic() - start
 
         # Determine final answer based on submission results
         if metadata["has_submissions"]:
@@ -298,12 +437,9 @@ class Agent(ABC):
         # Merge turn-level statistics into session-level statistics
         metadata = _merge_statistics(metadata)
 
-        # Create logs directory if it doesn't exist
-        os.makedirs("logs", exist_ok=True)
-
-        # Save metadata to logs/{session_id}.json
-        log_path = os.path.join("logs", f"{session_id}.json")
-        with open(log_path, "w") as f:
-            json.dump(metadata, f, indent=2)
+        # Save metadata to logs/{session_id}.json, the directory is created when logger is imported
+        log_path = os.path.join(LOGS_DIR, f"{session_id}.json")
+        # serializing a long session can take a while, keep it off the event loop
+        await asyncio.to_thread(_write_log, log_path, metadata)
 
         return final_answer, metadata
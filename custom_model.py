@@ -1,5 +1,10 @@
 import traceback
 import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import product
 from pathlib import Path
 
 from agent import Agent, agent_logger
@@ -9,7 +14,85 @@ from tool import (
     CppExecutor,
     Submission,
 )
-from utils import extract_text_from_pdf
+from utils import extract_text_from_pdf, extract_text_from_pdfs
+
+# problem statements by (problem_name, include_solution, problem directory mtime)
+_PROBLEM_CACHE: dict[tuple[str, bool, float], str] = {}
+
+# number of threads used to read the files of a problem directory
+READ_WORKERS = 8
+
+# generated or tooling directories that are never part of a problem statement, skipped without descending
+_IGNORED_DIRS = {"tests", "testcases", ".git", "__pycache__", "out"}
+
+# every capitalization of ".pdf", so the suffix test needs no lower() copy of the name
+_PDF_SUFFIXES = tuple("." + "".join(chars) for chars in product(*zip("pdf", "PDF")))
+
+
+def _walk(directory):
+    """
+    Recursively yield the files under a directory as os.DirEntry objects.
+
+    Entries are sorted by name within each directory, which gives the same order as
+    sorting the full paths. DirEntry caches the file type, so no extra stat calls are made.
+    Directories named in _IGNORED_DIRS are pruned before recursing.
+    """
+    with os.scandir(directory) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name not in _IGNORED_DIRS:
+                yield from _walk(entry.path)
+        elif entry.is_file(follow_symlinks=False):
+            yield entry
+
+def _read_one(entry, prefix_len: int) -> tuple[str, str]:
+    """
+    Read a single problem file.
+
+    Args:
+        entry (os.DirEntry): The file to read
+        prefix_len (int): Length of the problem directory path including the trailing separator,
+            stripped from the entry path for the displayed relative path
+
+    Returns:
+        tuple[str, str]: The relative path and the file contents, or an error message
+    """
+    file_path = entry.path
+    # Get relative path from problem directory for cleaner filename display
+    relative_path = file_path[prefix_len:]
+    try:
+        # Handle PDF files specially
+        if entry.name.endswith(_PDF_SUFFIXES):
+            try:
+                return relative_path, extract_text_from_pdf(file_path)
+            except Exception as pdf_error:
+                return relative_path, f"Error extracting text from PDF: {str(pdf_error)}"
+        # Read regular text files
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return relative_path, f.read()
+    except Exception as e:
+        # If we can't read a file, include an error message
+        return relative_path, f"Error reading file: {str(e)}"
+
+def _warm_pdf_cache(problem_names: list[str]):
+    """
+    Extract the PDFs of several problems in parallel processes, so reading the problem statements
+    afterwards finds their text in the cache.
+
+    Args:
+        problem_names (list[str]): The problems, e.g. "2024/nile"
+    """
+    pdf_paths = [
+        entry.path
+        for problem_name in dict.fromkeys(problem_names)
+        if (Path("exams") / problem_name).is_dir()
+        for entry in _walk(str(Path("exams") / problem_name))
+        if entry.name.endswith(_PDF_SUFFIXES)
+    ]
+    # a single PDF is not worth starting a worker process for
+    if len(pdf_paths) > 1:
+        extract_text_from_pdfs(pdf_paths)
 
 """
 Method which takes in a problem name (eg. "2024/nile") and returns a string with all the contents
@@ -25,39 +108,29 @@ def get_problem_statement(problem_name: str, include_solution: bool = False) ->
     # Get the directory where this file is located
     exams_dir = Path("exams") / problem_name
     
-    if not exams_dir.exists():
+    # a single stat both checks that the directory exists and provides the cache mtime
+    try:
+        exams_mtime = exams_dir.stat().st_mtime
+    except FileNotFoundError:
         return f"Error: Problem directory not found at {exams_dir}"
+
+    # problem files are static during an evaluation, the directory mtime only guards against
+    # files being added or removed between runs in the same process
+    cache_key = (problem_name, include_solution, exams_mtime)
+    if cache_key in _PROBLEM_CACHE:
+        return _PROBLEM_CACHE[cache_key]
     
-    result = []
-    
-    # Recursively walk through all files in the problem directory
-    for file_path in sorted(exams_dir.rglob("*")):
-        if file_path.is_file():
-            try:
-                # Get relative path from problem directory for cleaner filename display
-                relative_path = file_path.relative_to(exams_dir)
-                
-                # Handle PDF files specially
-                if file_path.suffix.lower() == '.pdf':
-                    try:
-                        file_contents = extract_text_from_pdf(str(file_path))
-                    except Exception as pdf_error:
-                        file_contents = f"Error extracting text from PDF: {str(pdf_error)}"
-                else:
-                    # Read regular text files
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        file_contents = f.read()
-                
-                # Format as [filename] followed by [file contents]
-                result.append(f"[{relative_path}]")
-                result.append(file_contents)
-                result.append("")  # Add empty line between files
-                
-            except Exception as e:
-                # If we can't read a file, include an error message
-                result.append(f"[{relative_path}]")
-                result.append(f"Error reading file: {str(e)}")
-                result.append("")
+    # Recursively walk through all files in the problem directory, reading them in parallel.
+    # The walk works on plain strings, entry paths all start with the directory path and a separator
+    exams_dir_str = str(exams_dir)
+    entries = list(_walk(exams_dir_str))
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        # Format as [filename] followed by [file contents] and an empty line between files,
+        # map yields the results in enumeration order
+        result = [
+            f"[{relative_path}]\n{file_contents}\n"
+            for relative_path, file_contents in executor.map(partial(_read_one, prefix_len=len(exams_dir_str) + 1), entries)
+        ]
     
     # Add solution if requested
     if include_solution:
@@ -69,29 +142,32 @@ def get_problem_statement(problem_name: str, include_solution: bool = False) ->
             solutions_dir = Path("solutions") / problem_name.rsplit("/", 1)[0]
             solution_path = solutions_dir / solution_filename
             
-            if solution_path.exists():
-                with open(solution_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    solution_contents = f.read()
-                
+            # open directly instead of checking exists() first
+            try:
+                solution_contents = solution_path.read_text(encoding='utf-8', errors='ignore')
+            except FileNotFoundError:
+                result.append(f"Warning: Solution file not found at {solution_path}")
+                result.append("")
+            else:
                 result.append("THE FOLLOWING IS THE SOLUTION TO THE ABOVE PROBLEM, PLEASE SUBMIT THIS DIRECTLY AS YOUR ANSWER")
                 result.append("")
                 result.append(solution_contents)
                 result.append("")
-            else:
-                result.append(f"Warning: Solution file not found at {solution_path}")
-                result.append("")
         except Exception as e:
             result.append(f"Error reading solution file: {str(e)}")
             result.append("")
     
-    return "\n".join(result)
+    problem_statement = "\n".join(result)
+    _PROBLEM_CACHE[cache_key] = problem_statement
+    return problem_statement
 
 
 async def get_custom_model(model_name: str, parameters: dict, *args, cheat: bool = False, log_level: str = "ERROR", **kwargs):
 
-    # set logging level
-    tool_logger.setLevel(log_level)
-    agent_logger.setLevel(log_level)
+    # set logging level, setLevel clears the cache of every logger so skip it when nothing changes
+    for logger in (tool_logger, agent_logger):
+        if logging.getLevelName(logger.level) != log_level:
+            logger.setLevel(log_level)
 
     max_turns = 100
     llm = get_registry_model(model_name)
@@ -99,6 +175,9 @@ async def get_custom_model(model_name: str, parameters: dict, *args, cheat: bool
     # hijack model logger
     llm.logger = agent_logger
 
+    # the executor holds no per-problem state, so one instance is shared by every call
+    cpp_executor = CppExecutor()
+
     async def custom_call(test_input: str = "2024/nile"): 
         # key line: mapping the question code to the full context for the model to start with
         # make sure include_solution is set to False for any real evaluation!!
@@ -106,7 +185,7 @@ async def get_custom_model(model_name: str, parameters: dict, *args, cheat: bool
         problem_path = Path("submission_scripts") / test_input
 
         tools = {
-            "cpp_executor": CppExecutor(),
+            "cpp_executor": cpp_executor,
             # key line: making sure the submission tool uses the parallel scripts for this q
             "submission": Submission(problem_path=problem_path),
         }
@@ -124,6 +203,7 @@ async def get_custom_model(model_name: str, parameters: dict, *args, cheat: bool
                 best_scores = tools["submission"].best_subtask_scores
                 submission_count = tools["submission"].submission_count
                 if best_scores and any(score > 0 for score in best_scores.values()):
+                    best_scores_str = str(best_scores)
                     best_scores_response = {
                         "best_subtask_scores": best_scores,
                         "best_total_score": sum(best_scores.values()),
@@ -131,12 +211,12 @@ async def get_custom_model(model_name: str, parameters: dict, *args, cheat: bool
                         "error_occurred": True,
                         "error": str(e)
                     }
-                    print(f"Returning best scores before crash: {best_scores}")
+                    print(f"Returning best scores before crash: {best_scores_str}")
             
             # If we have best scores, return them as the output
             if best_scores_response:
                 return {
-                    "llm_output": str(best_scores),  # Return best scores as the main output
+                    "llm_output": best_scores_str,  # Return best scores as the main output
                     "metadata": {
                         "submission_count": submission_count,
                         "error_occurred": True
@@ -163,4 +243,22 @@ async def get_custom_model(model_name: str, parameters: dict, *args, cheat: bool
             "output_context": metadata,
         }
 
+    async def custom_call_batch(test_inputs: list[str], concurrency: int = 8):
+        # every problem gets its own agent and tools inside custom_call, only the llm client is shared
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # statements are read on the event loop inside custom_call, extract all their PDFs up front
+        await asyncio.to_thread(_warm_pdf_cache, test_inputs)
+
+        async def call_one(test_input: str):
+            async with semaphore:
+                return await custom_call(test_input)
+
+        return await asyncio.gather(
+            *(call_one(test_input) for test_input in test_inputs), return_exceptions=True
+        )
+
+    # exposed on the single-problem callable so existing callers are unaffected
+    custom_call.batch = custom_call_batch
+
     return custom_call
@@ -1,5 +1,8 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 
 GREEN = "\x1b[32;20m"
@@ -26,6 +29,16 @@ MAX_MESSAGE_LENGTH = 1000
 LOGS_DIR = "logs"
 os.makedirs(LOGS_DIR, exist_ok=True)
 
+# all log files of a process share the timestamp of its start
+_RUN_TS = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def _truncate(formatted: str) -> str:
+    """Truncate a formatted log line that exceeds MAX_MESSAGE_LENGTH."""
+    if len(formatted) <= MAX_MESSAGE_LENGTH:
+        return formatted
+    return formatted[:MAX_MESSAGE_LENGTH] + "... [truncated]"
+
 
 def color(color):
     colored_str = "".join((color, LEVEL, RESET))
@@ -42,25 +55,37 @@ class ColorFormatter(logging.Formatter):
         logging.CRITICAL: color(BOLD_RED),
     }
 
-    def format(self, record):
-        # Truncate message if it exceeds MAX_MESSAGE_LENGTH
-        if len(record.msg) > MAX_MESSAGE_LENGTH:
-            record.msg = record.msg[:MAX_MESSAGE_LENGTH] + "... [truncated]"
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # one formatter per level, built once instead of for every record
+        self._formatters = {
+            level: logging.Formatter(log_fmt) for level, log_fmt in self.FORMATS.items()
+        }
 
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
+    def format(self, record):
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
+            # custom levels have no color and use the default "%(message)s" format
+            formatter = self._formatters[record.levelno] = logging.Formatter()
+        # Truncate the formatted line, the record itself is shared with the other handlers
+        return _truncate(formatter.format(record))
 
 
 class TruncatingFormatter(logging.Formatter):
     """Formatter that truncates long messages."""
 
     def format(self, record):
-        # Truncate message if it exceeds MAX_MESSAGE_LENGTH
-        if len(record.msg) > MAX_MESSAGE_LENGTH:
-            record.msg = record.msg[:MAX_MESSAGE_LENGTH] + "... [truncated]"
+        # Truncate the formatted line, the record itself is shared with the other handlers
+        return _truncate(super().format(record))
+
+
+# Formatters hold no per-logger state, so one instance of each is shared by all handlers
+_CONSOLE_FORMATTER = ColorFormatter()
+_FILE_FORMATTER = TruncatingFormatter(FILE_FORMAT)
 
-        return super().format(record)
+# One queue handler per logger name for the lifetime of the process, the file writes happen on
+# a background QueueListener thread so logging never blocks the event loop on disk IO
+_FILE_HANDLERS: dict[str, logging.handlers.QueueHandler] = {}
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -74,18 +99,24 @@ def get_logger(name: str) -> logging.Logger:
         # Console Handler (with colors, no date)
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.DEBUG)
-        console_formatter = ColorFormatter()
-        console_handler.setFormatter(console_formatter)
+        console_handler.setFormatter(_CONSOLE_FORMATTER)
         logger.addHandler(console_handler)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_file = os.path.join(LOGS_DIR, f"{name}_{timestamp}.log")
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.DEBUG)
-        file_formatter = TruncatingFormatter(
-            "%(asctime)s %(levelname)s -- %(name)s: %(message)s"
-        )
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        queue_handler = _FILE_HANDLERS.get(name)
+        if queue_handler is None:
+            log_file = os.path.join(LOGS_DIR, f"{name}_{_RUN_TS}.log")
+            file_handler = logging.FileHandler(log_file)
+            file_handler.setLevel(logging.DEBUG)
+            file_handler.setFormatter(_FILE_FORMATTER)
+
+            log_queue = queue.SimpleQueue()
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            queue_handler.setLevel(logging.DEBUG)
+            listener = logging.handlers.QueueListener(log_queue, file_handler)
+            listener.start()
+            # flush the queued records to the file on shutdown
+            atexit.register(listener.stop)
+            _FILE_HANDLERS[name] = queue_handler
+        logger.addHandler(queue_handler)
 
     return logger
@@ -1,6 +1,7 @@
 import os
 import sys
-import json
+import orjson
+import glob
 import asyncio
 import argparse
 from datetime import datetime
@@ -36,37 +37,72 @@ async def main():
         log_level="INFO" if args.verbose else "WARNING"
     )
     
-    # Run the test
-    print(f"\nProcessing: {test_question}")
-    try:
-        result = await custom_call(test_question)
-        success = True
-        error = None
-    except Exception as e:
-        result = None
-        success = False
-        error = str(e)
-    
-    # Format result
-    formatted_result = {
-        "question": test_question,
-        "success": success,
-        "model": model_name
-    }
-    if success:
-        formatted_result["result"] = result
-    else:
-        formatted_result["error"] = error
-    
-    # Print status
-    status = "✓ Success" if success else "✗ Failed"
-    print(f"\n{status}: {test_question}")
-    if success:
-        print(f"Result: {json.dumps(result['llm_output'], indent=2)}")
-    if not success:
-        print(f"Error: {error}")
-    
-    return formatted_result
+    # Run the tests, the agents for the different questions run concurrently
+    print(f"\nProcessing: {', '.join(test_questions)}")
+    results = await custom_call.batch(test_questions, concurrency=args.concurrency)
+
+    formatted_results = []
+    for test_question, result in zip(test_questions, results):
+        success = not isinstance(result, BaseException)
+        error = None if success else str(result)
+
+        # Format result
+        formatted_result = {
+            "question": test_question,
+            "success": success,
+            "model": model_name
+        }
+        if success:
+            formatted_result["result"] = result
+        else:
+            formatted_result["error"] = error
+
+        # Print status
+        status = "✓ Success" if success else "✗ Failed"
+        print(f"\n{status}: {test_question}")
+        if success:
+            print(f"Result: {orjson.dumps(result['llm_output'], option=orjson.OPT_INDENT_2).decode()}")
+        if not success:
+            print(f"Error: {error}")
+
+        formatted_results.append(formatted_result)
+
+    return formatted_results
+
+def expand_tests(tests: str) -> list[str]:
+    """
+    Expand the --test argument into a list of questions.
+
+    Args:
+        tests (str): Comma-separated questions, each may be a glob over the exams directory (eg. "2024/*")
+
+    Returns:
+        list[str]: The questions in the given order, globs expanded in sorted order
+
+    Raises:
+        ValueError: If a glob matches no problem directory or no question is given
+    """
+    # globs are resolved next to this file, so they match wherever the script is started from
+    exams_dir = os.path.join(current_dir, "exams")
+    questions = []
+    for pattern in tests.split(","):
+        pattern = pattern.strip()
+        if not pattern:
+            continue
+        if glob.has_magic(pattern):
+            matches = sorted(
+                os.path.relpath(path, exams_dir)
+                for path in glob.glob(os.path.join(exams_dir, pattern))
+                if os.path.isdir(path)
+            )
+            if not matches:
+                raise ValueError(f"--test pattern {pattern!r} matches no problem in {exams_dir}")
+            questions.extend(matches)
+        else:
+            questions.append(pattern)
+    if not questions:
+        raise ValueError("--test names no question")
+    return questions
 
 if __name__ == "__main__":
     # Parse command line arguments
@@ -74,11 +110,15 @@ if __name__ == "__main__":
     parser.add_argument('--cheat', action='store_true', help='pass solutions to the agent')
     parser.add_argument('--verbose', action='store_true', help='verbose output')
     parser.add_argument('--model', type=str, default='openai/gpt-5.1-codex', help='Model to use (default: codex)')
-    parser.add_argument('--test', type=str, default='2024/sphinx', help='Test to run (e.g., 2024/sphinx)')
+    parser.add_argument('--test', type=str, default='2024/sphinx', help='Tests to run, comma-separated, globs allowed (e.g., 2024/sphinx,2025/*)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Maximum number of tests run at the same time (default: 8)')
     args = parser.parse_args()
     
-    # Get test from command line
-    test_question = args.test
+    # Get tests from command line
+    try:
+        test_questions = expand_tests(args.test)
+    except ValueError as e:
+        parser.error(str(e))
 
     # Use model from command line argument
     model_name = args.model
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+import tool
+
+INFINITE_OUTPUT = '```\n#include <cstdio>\nint main() { for (;;) puts("spam spam spam"); }\n```'
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # compiled binaries and headers go to a throwaway cache
+    monkeypatch.setattr(tool, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(tool, "_PCH_DIRS", {})
+
+
+def test_kill_reaps_process_with_unread_pipes():
+    async def run():
+        process = await asyncio.create_subprocess_exec(
+            "yes",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        # the timeout cancels the readers while the pipes are full
+        with pytest.raises(TimeoutError):
+            async with asyncio.timeout(0.5):
+                await asyncio.gather(tool._drain(process.stdout), tool._drain(process.stderr), process.wait())
+        async with asyncio.timeout(10):
+            await tool._kill(process)
+        return process.returncode
+
+    assert asyncio.run(run()) == -signal.SIGKILL
+
+
+def test_cpp_executor_times_out_on_infinite_output():
+    executor = tool.CppExecutor(timeout=2)
+
+    async def run():
+        async with asyncio.timeout(120):
+            return await executor.call_tool({"cpp_code": INFINITE_OUTPUT})
+
+    result = asyncio.run(run())
+    assert result["success"] is False
+    assert "timed out" in result["error"]
+
+
+def test_cpp_executor_marks_truncated_output():
+    executor = tool.CppExecutor(timeout=30)
+    code = '```\n#include <cstdio>\nint main() { for (int i = 0; i < 400000; i++) printf("line %d\\n", i); }\n```'
+
+    result = asyncio.run(executor.call_tool({"cpp_code": code}))
+    assert result["success"] is True
+    assert result["output"].startswith("...[truncated ")
+    assert result["output"].endswith("line 399999\n")
+    assert len(result["output"].encode()) <= tool.OUTPUT_LIMIT + 64
+
+
+def test_cpp_executor_times_out_after_truncated_output():
+    # more output than is kept, then the program keeps running silently
+    executor = tool.CppExecutor(timeout=2)
+    code = (
+        '```\n#include <cstdio>\nint main() { for (int i = 0; i < 400000; i++) printf("line %d\\n", i);'
+        ' fflush(stdout); volatile int spin = 1; while (spin) {} }\n```'
+    )
+
+    async def run():
+        async with asyncio.timeout(120):
+            return await executor.call_tool({"cpp_code": code})
+
+    result = asyncio.run(run())
+    assert result["success"] is False
+    assert "timed out" in result["error"]
+
+
+def test_cpp_executor_constructor_has_no_side_effects():
+    tool.CppExecutor()
+    assert not os.path.exists(tool.CACHE_DIR)
+
+
+def test_failed_header_build_leaves_no_temporary_file():
+    assert tool._precompile_header("g++", ["-std=c++20"], "no_such_header.h") is None
+    leftovers = [name for _, _, names in os.walk(tool.CACHE_DIR) for name in names if name.endswith(".tmp")]
+    assert leftovers == []
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+import utils
+from utils import has_compilation_error, simple_extract_code
+
+
+@pytest.mark.parametrize(
+    "model_output, code",
+    [
+        ("```cpp\nint main() {}\n```", "int main() {}"),
+        ("Here it is:\n```cpp\nint a;\nint b;\n```\nDone.", "int a;\nint b;"),
+        # inline opening fence
+        ("Here it is: ```cpp\nint main() {}\n```", "int main() {}"),
+        ("Here it is: ```cpp\nint main() {}\n``` hope it helps", "int main() {}"),
+        # multiple blocks, the last one wins
+        ("```\nA\n```\ntext\n```cpp\nB\nC\n```", "B\nC"),
+        ("```\nA\n```\nUse ``` to fence code.", "A"),
+        # unterminated block after a complete one
+        ("```\nA\n```\n```\nunterminated", "A"),
+        ("```cpp\nunterminated", ""),
+        ("  ```cpp\n  int a;\n  ```", "  int a;"),
+        ("```\n```", ""),
+        ("no code", ""),
+    ],
+)
+def test_simple_extract_code(model_output, code):
+    assert simple_extract_code(model_output) == code
+
+
+# every compilation-error engine available here, the optional ones only ever see ASCII output
+ENGINES = {"re": utils._search_compilation_error}
+if utils._COMPILE_ERR_SET is not None:
+    ENGINES["re2"] = lambda output: bool(utils._COMPILE_ERR_SET.Match(output))
+if utils._COMPILE_ERR_DB is not None:
+    ENGINES["hyperscan"] = utils._scan_compilation_error
+
+COMPILER_OUTPUTS = [
+    ("main.cpp:3:5: error: 'x' was not declared in this scope; did you mean error", True),
+    ("FATAL ERROR: bits/stdc++.h: No such file or directory", True),
+    ("/usr/bin/ld: main.o: undefined reference to `init(int)'", True),
+    ("/usr/bin/ld: cannot find -lfoo", True),
+    ("collect2: error: ld returned 1 exit status", True),
+    ("make: *** [Makefile:2: all] Error 2", True),
+    ("G++ reported an ERROR", True),
+    ("clang: error: linker command failed", True),
+    ("Compilation Failed", True),
+    ("All tests passed\nPassed tests: 1 2 3", False),
+    ("Test 3: wrong answer, error: expected 1", False),
+    ("error:\nerror", False),
+    ("xerror:" * 50, False),
+    # non-ASCII output, matched with ASCII case folding and word boundaries on every machine
+    ("naïve error: and error", True),
+    ("ld returned 1 exit \u017ftatus", False),
+    ("ma\u212ae [1] Error 2", False),
+    ("comp\u0130lation failed", False),
+    ("errör: error", False),
+]
+
+
+@pytest.mark.parametrize("output, expected", COMPILER_OUTPUTS)
+def test_has_compilation_error(output, expected):
+    assert has_compilation_error(output, "") is expected
+    assert has_compilation_error("", output) is expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_compilation_error_engines_agree(engine):
+    for output, expected in COMPILER_OUTPUTS:
+        if output.isascii():
+            assert ENGINES[engine](output) is expected, output
+
+
+def _exit_worker(pdf_path):
+    # stands in for a native crash in the PDF library
+    os._exit(1)
+
+
+def test_extract_text_from_pdfs_survives_a_dead_worker(tmp_path, monkeypatch):
+    pdf_paths = []
+    for name in ("a.pdf", "b.pdf"):
+        pdf_path = tmp_path / name
+        pdf_path.write_bytes(b"%PDF-1.4")
+        pdf_paths.append(str(pdf_path))
+    monkeypatch.setattr(utils, "_extract_text_or_none", _exit_worker)
+
+    assert utils.extract_text_from_pdfs(pdf_paths) == {}
+
+
+def test_pdf_text_cache_round_trips_carriage_returns(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "a.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4")
+    monkeypatch.setattr(utils, "PDF_TEXT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(utils, "_PDF_CACHE", {})
+    monkeypatch.setattr(utils, "_PDF_BACKENDS", (lambda data: "a\r\nb\rc\n",))
+
+    assert utils.extract_text_from_pdf(str(pdf_path)) == "a\r\nb\rc\n"
+    # the second read comes from the disk cache
+    utils._PDF_CACHE.clear()
+    assert utils.extract_text_from_pdf(str(pdf_path)) == "a\r\nb\rc\n"
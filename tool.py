@@ -1,4 +1,4 @@
-import json
+import orjson
 import re
 import os
 import traceback
@@ -7,6 +7,12 @@ import tempfile
 import asyncio
 import shutil
 import glob
+import signal
+import time
+import logging
+import fcntl
+import hashlib
+import functools
 
 from abc import ABC, abstractmethod
 from openai.types.chat import ChatCompletionMessageToolCall
@@ -19,6 +25,270 @@ from utils import simple_extract_code, has_compilation_error
 
 tool_logger = get_logger(__name__)
 
+# "Passed tests: test1 test2 test3" line printed by the test scripts
+_PASSED_RE = re.compile(r"Passed tests:\s*(.+)")
+
+# bytes of stdout and stderr kept per process, older output is dropped
+OUTPUT_LIMIT = 1 << 20
+
+# memory-backed directory for throwaway source files, None falls back to the default temp directory.
+# Only files that are never executed go here, /dev/shm is often mounted noexec
+SCRATCH_DIR = next(
+    (
+        directory
+        for directory in (os.environ.get("XDG_RUNTIME_DIR"), "/dev/shm")
+        if directory and os.path.isdir(directory) and os.access(directory, os.W_OK)
+    ),
+    None,
+)
+
+# persistent caches shared by all runs on this machine
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ioi_agent")
+
+# compiled binaries kept in CACHE_DIR/bin, the least recently used beyond this are removed on startup
+BINARY_CACHE_MAX_ENTRIES = 1000
+
+# age in seconds after which a compile's temporary file is removed on startup, younger ones may
+# belong to a compile still running in another process
+_STALE_TMP_AGE = 3600
+
+# limits the test suites running at once across every Submission in the process, one per core.
+# Created on first use by _test_run_semaphore, together with the event loop it belongs to
+_TEST_RUN_SEMAPHORE: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+# precompiled header include directories by compiler and flags, None if the header could not be built
+_PCH_DIRS: dict[tuple[str, ...], str | None] = {}
+
+
+def _precompile_header(compiler: str, compiler_flags: list[str], header: str) -> str | None:
+    """
+    Build a precompiled version of a header that is force-included with -include.
+
+    The header is precompiled once per compiler version and flags into CACHE_DIR/pch. The
+    returned directory holds a wrapper header next to its .gch, putting it first on the include
+    path makes g++ load the .gch instead of parsing the header. If the .gch does not match the
+    flags of a compilation, the wrapper includes the real header instead.
+
+    Args:
+        compiler (str): The compiler executable
+        compiler_flags (list[str]): The flags the header is compiled with, without the -include
+        header (str): The header to precompile, as written in the include (eg. "bits/stdc++.h")
+
+    Returns:
+        str | None: The directory to add with -I, or None if the header could not be precompiled
+    """
+    key = (compiler, header, *compiler_flags)
+    if key in _PCH_DIRS:
+        return _PCH_DIRS[key]
+
+    pch_dir = None
+    try:
+        version = subprocess.run(
+            [compiler, "--version"], capture_output=True, check=True, timeout=30
+        ).stdout
+        digest = hashlib.sha256(version + repr(key).encode()).hexdigest()[:16]
+        cache_dir = os.path.join(CACHE_DIR, "pch", digest)
+        header_path = os.path.join(cache_dir, header)
+        gch_path = header_path + ".gch"
+        os.makedirs(os.path.dirname(header_path), exist_ok=True)
+
+        # several processes can start at once, only one of them builds the header
+        with open(os.path.join(cache_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if not os.path.exists(gch_path):
+                with open(header_path, "w") as f:
+                    f.write(f"#include_next <{header}>\n")
+                tmp_path = f"{gch_path}.{os.getpid()}.tmp"
+                try:
+                    subprocess.run(
+                        [compiler, *compiler_flags, "-x", "c++-header", header_path, "-o", tmp_path],
+                        capture_output=True, check=True, timeout=600,
+                    )
+                    os.replace(tmp_path, gch_path)
+                finally:
+                    # a failed or interrupted build must not leave its partial output behind
+                    try:
+                        os.unlink(tmp_path)
+                    except FileNotFoundError:
+                        pass
+        pch_dir = cache_dir
+    except Exception as e:
+        tool_logger.warning(f"\033[1;33mCould not precompile {header}, compiling without it: {e}\033[0m")
+
+    _PCH_DIRS[key] = pch_dir
+    return pch_dir
+
+
+async def _drain(stream: asyncio.StreamReader, limit: int = OUTPUT_LIMIT) -> bytes:
+    """
+    Read a process stream until EOF, keeping only the last `limit` bytes.
+
+    If a drain is cancelled (eg. by a timeout), its pipe must still be read to EOF, or closed,
+    before anything waits on the process: Process.wait() does not return while a pipe is open.
+    _kill takes care of that.
+
+    Args:
+        stream (asyncio.StreamReader): The stdout or stderr of a process
+        limit (int): Maximum number of bytes kept
+
+    Returns:
+        bytes: The tail of the output, starting at a UTF-8 character boundary. If anything was
+            dropped, it is preceded by a "...[truncated N bytes]" line
+    """
+    buffer = bytearray()
+    dropped = 0
+    while chunk := await stream.read(1 << 16):
+        buffer += chunk
+        if len(buffer) > limit:
+            dropped += len(buffer) - limit
+            del buffer[:len(buffer) - limit]
+    if dropped:
+        # drop the continuation bytes of a character cut in half
+        while buffer and buffer[0] & 0xC0 == 0x80:
+            del buffer[0]
+            dropped += 1
+        # the reader must know the output is incomplete
+        buffer[:0] = b"...[truncated %d bytes]\n" % dropped
+    return bytes(buffer)
+
+
+@functools.lru_cache(maxsize=None)
+def _read_json(path: str) -> dict:
+    """Parse a problem JSON file, once per process. The result is shared and must not be modified."""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+@functools.lru_cache(maxsize=None)
+def _problem_files(problem_path: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """
+    List the graders, checker and tests of a problem, once per process.
+
+    Args:
+        problem_path (str): The problem's submission script directory
+
+    Returns:
+        tuple[tuple[str, ...], tuple[str, ...]]: The directories and the files, relative to the
+            problem path, directories listed before their contents
+    """
+    directories = []
+    files = []
+    for name in ("graders", "checker", "tests"):
+        root = os.path.join(problem_path, name)
+        if not os.path.isdir(root):
+            # only the checker is optional (sphinx doesn't have it for instance)
+            if name == "checker":
+                continue
+            raise FileNotFoundError(f"No such directory: '{root}'")
+        for dirpath, _, filenames in os.walk(root, followlinks=True):
+            relative_dir = os.path.relpath(dirpath, problem_path)
+            directories.append(relative_dir)
+            files.extend(os.path.join(relative_dir, filename) for filename in filenames)
+    return tuple(directories), tuple(files)
+
+
+@functools.cache
+def _sweep_binary_cache():
+    """
+    Clean up the binary cache, once per process.
+
+    Temporary files left behind by interrupted compiles are removed, and if the cache holds
+    more than BINARY_CACHE_MAX_ENTRIES binaries the least recently used ones are evicted.
+    Cache hits refresh the binary's mtime, so it orders the binaries by last use.
+    """
+    root = os.path.join(CACHE_DIR, "bin")
+    try:
+        with os.scandir(root) as it:
+            shard_dirs = [entry.path for entry in it if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return
+    now = time.time()
+    stale = []
+    binaries = []
+    for shard_dir in shard_dirs:
+        try:
+            with os.scandir(shard_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".tmp"):
+                        if now - entry.stat(follow_symlinks=False).st_mtime > _STALE_TMP_AGE:
+                            stale.append(entry.path)
+                    elif entry.name.endswith(".out"):
+                        binaries.append((entry.stat(follow_symlinks=False).st_mtime, entry.path))
+        except OSError:
+            continue
+    if len(binaries) > BINARY_CACHE_MAX_ENTRIES:
+        binaries.sort()
+        stale.extend(path for _, path in binaries[:len(binaries) - BINARY_CACHE_MAX_ENTRIES])
+    for path in stale:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _test_run_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore shared by all submissions, creating it for the running event loop."""
+    global _TEST_RUN_SEMAPHORE
+    loop = asyncio.get_running_loop()
+    if _TEST_RUN_SEMAPHORE is None or _TEST_RUN_SEMAPHORE[0] is not loop:
+        _TEST_RUN_SEMAPHORE = (loop, asyncio.Semaphore(os.cpu_count() or 1))
+    return _TEST_RUN_SEMAPHORE[1]
+
+
+async def _kill(process: asyncio.subprocess.Process | None):
+    """
+    Kill a process that is still running, together with everything it started, and reap it.
+
+    The process must have been started with start_new_session=True, so its pid is also the id
+    of a process group containing its children.
+
+    Its pipes are read to EOF before it is reaped. A cancelled _drain leaves them unread, and
+    Process.wait() only returns once every pipe has been closed, which a paused pipe never is.
+    """
+    if process is None or process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    # the output is discarded, only what was left in the pipe buffers is read
+    await process.communicate()
+
+
+def _copy_problem_files(problem_path: str, work_dir: str):
+    """
+    Copy the graders, checker and tests of a problem into a work directory.
+
+    The files are listed once per process, so no directory tree is walked per submission.
+    """
+    directories, files = _problem_files(problem_path)
+    for directory in directories:
+        os.makedirs(os.path.join(work_dir, directory))
+    for file in files:
+        _clone_or_copy(os.path.join(problem_path, file), os.path.join(work_dir, file))
+
+
+# ioctl request of Linux's FICLONE, which makes a file share another's data copy-on-write
+_FICLONE = 0x40049409
+
+
+def _clone_or_copy(src: str, dst: str) -> str:
+    """
+    Copy a file, as a copy-on-write reflink where the filesystem supports it (eg. btrfs, XFS).
+
+    The copy must never share an inode with the original: the contestant binary, the checker and
+    the test scripts all run in the work directory, and anything they write must not reach the
+    problem files used by every later submission. Falls back to a regular copy.
+    """
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
 class Tool(ABC):
     """
     Abstract base class for tools.
@@ -99,7 +369,7 @@ class Tool(ABC):
                     "usage": tool_result["usage"],
                 }
             else:
-                return {"success": True, "result": json.dumps(tool_result)}
+                return {"success": True, "result": orjson.dumps(tool_result).decode()}
         except Exception as e:
             
             # logging
@@ -153,6 +423,44 @@ class CppExecutor(Tool):
         self.compiler = compiler
         # girlboss mode: add bits/stdc++ flag for maximum slay
         self.compiler_flags = compiler_flags or ["-std=c++20", "-O2", "-include", "bits/stdc++.h"]
+        # the full flags, including the precompiled header, are set up on the first compile
+        self._flags: list[str] | None = None
+        self._setup_lock = asyncio.Lock()
+
+    async def _compile_flags(self) -> list[str]:
+        """
+        The flags every compilation uses, set up on first use.
+
+        Precompiling the header can take minutes and sweeping the binary cache touches the disk,
+        so both run in a thread instead of the constructor.
+
+        Returns:
+            list[str]: The compiler flags, including the precompiled header ones
+        """
+        if self._flags is None:
+            async with self._setup_lock:
+                if self._flags is None:
+                    pch_flags = await asyncio.to_thread(self._pch_flags)
+                    await asyncio.to_thread(_sweep_binary_cache)
+                    self._flags = ["-pipe", *pch_flags, *self.compiler_flags]
+        return self._flags
+
+    def _pch_flags(self) -> list[str]:
+        """
+        Flags that make the compiler use a precompiled version of the force-included header.
+
+        Returns:
+            list[str]: The include flags, empty if there is no -include or precompiling failed
+        """
+        if "-include" not in self.compiler_flags:
+            return []
+        index = self.compiler_flags.index("-include")
+        header = self.compiler_flags[index + 1]
+        base_flags = self.compiler_flags[:index] + self.compiler_flags[index + 2:]
+        pch_dir = _precompile_header(self.compiler, base_flags, header)
+        if pch_dir is None:
+            return []
+        return ["-I", pch_dir, "-Winvalid-pch"]
 
     async def _compile_and_run_cpp(self, cpp_code: str) -> dict:
         """
@@ -164,46 +472,73 @@ class CppExecutor(Tool):
         Returns:
             dict: Contains 'success', 'output', 'error', and 'exit_code'
         """
-        # Create temporary files for the source and executable
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.cpp', delete=False) as src_file:
-            src_file.write(cpp_code)
-            src_path = src_file.name
-        
-        with tempfile.NamedTemporaryFile(suffix='.out', delete=False) as exe_file:
-            exe_path = exe_file.name
+        # Identical code compiled with identical flags gives the same binary, so binaries are
+        # cached on disk by a hash of both and recompiling is skipped on a hit
+        compiler_flags = await self._compile_flags()
+        key = hashlib.sha256(repr((self.compiler, compiler_flags, cpp_code)).encode()).hexdigest()
+        binary_dir = os.path.join(CACHE_DIR, "bin", key[:2])
+        binary_path = os.path.join(binary_dir, f"{key}.out")
+        src_path = None
+        exe_path = None
+        compile_process = None
+        run_process = None
         
         try:
-            # Compile the C++ code
-            compile_cmd = [self.compiler] + self.compiler_flags + [src_path, "-o", exe_path]
-            
-            compile_process = await asyncio.create_subprocess_exec(
-                *compile_cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            compile_stdout, compile_stderr = await asyncio.wait_for(
-                compile_process.communicate(), timeout=self.timeout
-            )
-            
-            if compile_process.returncode != 0:
-                return {
-                    "success": False,
-                    "output": "",
-                    "error": f"Compilation failed:\n{compile_stderr.decode()}",
-                    "exit_code": compile_process.returncode
-                }
+            try:
+                # refresh the mtime so the startup sweep evicts the least recently used binaries first
+                os.utime(binary_path)
+                cached = True
+            except FileNotFoundError:
+                cached = False
+            if not cached:
+                # Create a temporary file for the source in memory, the executable is written next
+                # to its final path so it can be moved into the cache atomically
+                with tempfile.NamedTemporaryFile(mode='wb', suffix='.cpp', dir=SCRATCH_DIR, delete=False) as src_file:
+                    src_file.write(cpp_code.encode())
+                    src_path = src_file.name
+                
+                os.makedirs(binary_dir, exist_ok=True)
+                exe_fd, exe_path = tempfile.mkstemp(suffix='.tmp', dir=binary_dir)
+                os.close(exe_fd)
+                
+                # Compile the C++ code
+                compile_cmd = [self.compiler] + compiler_flags + [src_path, "-o", exe_path]
+                
+                compile_process = await asyncio.create_subprocess_exec(
+                    *compile_cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True
+                )
+                
+                async with asyncio.timeout(self.timeout):
+                    compile_stdout, compile_stderr, _ = await asyncio.gather(
+                        _drain(compile_process.stdout), _drain(compile_process.stderr), compile_process.wait()
+                    )
+                
+                if compile_process.returncode != 0:
+                    return {
+                        "success": False,
+                        "output": "",
+                        "error": f"Compilation failed:\n{compile_stderr.decode()}",
+                        "exit_code": compile_process.returncode
+                    }
+                
+                os.replace(exe_path, binary_path)
+                exe_path = None
             
             # Run the compiled executable
             run_process = await asyncio.create_subprocess_exec(
-                exe_path,
+                binary_path,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
             )
             
-            run_stdout, run_stderr = await asyncio.wait_for(
-                run_process.communicate(), timeout=self.timeout
-            )
+            async with asyncio.timeout(self.timeout):
+                run_stdout, run_stderr, _ = await asyncio.gather(
+                    _drain(run_process.stdout), _drain(run_process.stderr), run_process.wait()
+                )
             
             output = run_stdout.decode()
             error = run_stderr.decode()
@@ -230,12 +565,18 @@ class CppExecutor(Tool):
                 "exit_code": -1
             }
         finally:
-            # Clean up temporary files
-            try:
-                os.unlink(src_path)
-                os.unlink(exe_path)
-            except OSError:
-                pass  # Files might not exist or be accessible
+            # Don't leave a timed out or cancelled compiler or program running
+            await _kill(compile_process)
+            await _kill(run_process)
+            
+            # Clean up temporary files, the cached binary is kept
+            for path in (src_path, exe_path):
+                if path is None:
+                    continue
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass  # Files might not exist or be accessible
 
     async def call_tool(self, arguments: dict) -> dict:
         """
@@ -327,8 +668,7 @@ class Submission(Tool):
         """Load problem configuration from problem.json"""
         try:
             problem_json_path = os.path.join(self.problem_path, "problem.json")
-            with open(problem_json_path, 'r') as f:
-                self.problem_config = json.load(f)
+            self.problem_config = _read_json(problem_json_path)
             
             self.time_limit = self.problem_config.get("time_limit", 2.0)
             # Convert memory limit from bytes to kilobytes for ulimit
@@ -349,16 +689,24 @@ class Submission(Tool):
         try:
             for subtask_file in glob.glob(os.path.join(subtasks_dir, "*.json")):
                 subtask_name = os.path.basename(subtask_file).replace(".json", "")
-                with open(subtask_file, 'r') as f:
-                    subtask_data = json.load(f)
-                    self.subtasks[subtask_name] = {
-                        "score": subtask_data["score"],
-                        "testcases": subtask_data["testcases"]
-                    }
+                subtask_data = _read_json(subtask_file)
+                self.subtasks[subtask_name] = {
+                    "score": subtask_data["score"],
+                    "testcases": subtask_data["testcases"]
+                }
         except Exception as e:
             tool_logger.error(f"Failed to load subtasks: {e}")
             self.subtasks = {}
         
+        # Give every test a bit, a subtask is complete when all the bits of its tests are set
+        self._test_bits = {}
+        self._subtask_masks = {}
+        for subtask_name, subtask_data in self.subtasks.items():
+            mask = 0
+            for test in subtask_data["testcases"]:
+                mask |= 1 << self._test_bits.setdefault(test, len(self._test_bits))
+            self._subtask_masks[subtask_name] = mask
+        
         # Initialize best scores for each subtask to 0
         self.best_subtask_scores = {name: 0 for name in self.subtasks.keys()}
 
@@ -388,24 +736,15 @@ class Submission(Tool):
         """
         # Create a temporary working directory
         with tempfile.TemporaryDirectory() as temp_dir:
+            process = None
             try:
                 # Copy all necessary files to temp directory
                 solution_path = os.path.join(temp_dir, "solution.cpp")
-                with open(solution_path, 'w') as f:
-                    f.write(cpp_code)
+                with open(solution_path, 'wb') as f:
+                    f.write(cpp_code.encode())
                 
-                # Copy graders, checker, tests, and script
-                shutil.copytree(os.path.join(self.problem_path, "graders"), 
-                              os.path.join(temp_dir, "graders"))
-                              
-                # only copy it if it's there (sphinx doesn't have it for instance)
-                checker_src = os.path.join(self.problem_path, "checker")
-                checker_dst = os.path.join(temp_dir, "checker")
-                if os.path.exists(checker_src) and os.path.isdir(checker_src):
-                    shutil.copytree(checker_src, checker_dst)
-
-                shutil.copytree(os.path.join(self.problem_path, "tests"), 
-                              os.path.join(temp_dir, "tests"))
+                # Copy graders, checker, tests, and script, in a thread to keep the event loop free
+                await asyncio.to_thread(_copy_problem_files, os.fspath(self.problem_path), temp_dir)
                 
                 # Copy and make script executable
                 script_src = os.path.join(self.problem_path, "run_tests.sh")
@@ -424,12 +763,14 @@ class Submission(Tool):
                     *cmd,
                     cwd=temp_dir,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
                 )
             
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), timeout=3000  # 5 minute timeout for all tests
-                )
+                async with asyncio.timeout(3000):  # 5 minute timeout for all tests
+                    stdout, stderr, _ = await asyncio.gather(
+                        _drain(process.stdout), _drain(process.stderr), process.wait()
+                    )
                 
                 stdout_str = stdout.decode()
                 stderr_str = stderr.decode()
@@ -487,29 +828,19 @@ class Submission(Tool):
                     "stdout": "",
                     "stderr": f"Error running tests: {str(e)}"
                 }
+            finally:
+                # Kill the script and the solutions it started before the directory is removed
+                await _kill(process)
 
     def _parse_passed_tests(self, stdout: str, stderr: str) -> list:
         """Parse the output to find which tests passed"""
-        passed_tests = []
-        
         # Look for "Passed tests: test1 test2 test3" in stdout
-        import re
-        passed_pattern = r"Passed tests:\s*(.+)"
-        match = re.search(passed_pattern, stdout)
-        if match:
-            # Extract the test names (space-separated)
-            test_names = match.group(1).strip().split()
-            passed_tests.extend(test_names)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_passed = []
-        for test in passed_tests:
-            if test not in seen:
-                seen.add(test)
-                unique_passed.append(test)
+        match = _PASSED_RE.search(stdout)
+        if not match:
+            return []
         
-        return unique_passed
+        # Extract the test names (space-separated), removing duplicates while preserving order
+        return list(dict.fromkeys(match.group(1).split()))
 
     def _calculate_subtask_scores(self, test_results: dict) -> dict:
         """
@@ -526,21 +857,28 @@ class Submission(Tool):
         completed_subtasks = []
         subtask_scores = {}
         
-        tool_logger.info(f"\033[1;33m Passed tests: {passed_tests} \033[0m")
+        tool_logger.info("\033[1;33m Passed tests: %s \033[0m", passed_tests)
+        
+        passed_mask = 0
+        for test in passed_tests:
+            bit = self._test_bits.get(test)
+            if bit is not None:
+                passed_mask |= 1 << bit
         
         for subtask_name, subtask_data in self.subtasks.items():
             # Check if all tests in this subtask passed
-            subtask_tests = set(subtask_data["testcases"])
-            tool_logger.info(f"\033[1;33m Subtask {subtask_name} requires tests: {subtask_tests} \033[0m")
+            tool_logger.info("\033[1;33m Subtask %s requires tests: %s \033[0m", subtask_name, subtask_data["testcases"])
             
-            if subtask_tests.issubset(passed_tests):  # All required tests passed
+            mask = self._subtask_masks[subtask_name]
+            if passed_mask & mask == mask:  # All required tests passed
                 completed_subtasks.append(subtask_name)
                 subtask_scores[subtask_name] = subtask_data["score"]
-                tool_logger.info(f"\033[1;33m Subtask {subtask_name} completed! Awarded {subtask_data['score']} points \033[0m")
+                tool_logger.info("\033[1;33m Subtask %s completed! Awarded %s points \033[0m", subtask_name, subtask_data["score"])
             else:
                 subtask_scores[subtask_name] = 0
-                missing_tests = subtask_tests - passed_tests
-                tool_logger.info(f"\033[1;33m Subtask {subtask_name} incomplete. Missing tests: {missing_tests} \033[0m")
+                if tool_logger.isEnabledFor(logging.INFO):
+                    missing_tests = set(subtask_data["testcases"]) - passed_tests
+                    tool_logger.info("\033[1;33m Subtask %s incomplete. Missing tests: %s \033[0m", subtask_name, missing_tests)
                 
         total_score = sum(subtask_scores.values())
         
@@ -558,10 +896,12 @@ class Submission(Tool):
             arguments (dict): Contains 'cpp_code' key with the code to submit
             
         Returns:
-            dict: Contains score breakdown, submission info, and test results
+            dict: Contains score breakdown, submission info, and test results. best_subtask_scores
+                is the live dict of this tool, it is serialized right away and must not be modified
         """
-        # Increment submission count
+        # Increment submission count, submissions can run concurrently so this one keeps its own number
         self.submission_count += 1
+        submission_number = self.submission_count
         
         # Check if maximum submissions reached
         if self.submission_count > self.max_submissions:
@@ -571,7 +911,7 @@ class Submission(Tool):
                 "subtask_scores": {},
                 "completed_subtasks": [],
                 "best_total_score": best_total_score,
-                "best_subtask_scores": self.best_subtask_scores.copy(),
+                "best_subtask_scores": self.best_subtask_scores,
                 "submission_count": self.submission_count,
                 "max_submissions": self.max_submissions,
                 "submissions_remaining": 0,
@@ -594,7 +934,7 @@ class Submission(Tool):
                 "subtask_scores": {},
                 "completed_subtasks": [],
                 "best_total_score": best_total_score,
-                "best_subtask_scores": self.best_subtask_scores.copy(),
+                "best_subtask_scores": self.best_subtask_scores,
                 "submission_count": self.submission_count,
                 "max_submissions": self.max_submissions,
                 "submissions_remaining": self.max_submissions - self.submission_count,
@@ -602,7 +942,9 @@ class Submission(Tool):
             }
         
         # Run tests with the solution
-        test_results = await self._run_tests_with_solution(extracted_code)
+        # each submission runs a whole test suite, the semaphore is shared by every problem in the process
+        async with _test_run_semaphore():
+            test_results = await self._run_tests_with_solution(extracted_code)
         
         # Calculate subtask scores
         scoring_results = self._calculate_subtask_scores(test_results)
@@ -616,10 +958,10 @@ class Submission(Tool):
             "subtask_scores": scoring_results["subtask_scores"],
             "completed_subtasks": scoring_results["completed_subtasks"],
             "best_total_score": best_total_score,
-            "best_subtask_scores": self.best_subtask_scores.copy(),
-            "submission_count": self.submission_count,
+            "best_subtask_scores": self.best_subtask_scores,
+            "submission_count": submission_number,
             "max_submissions": self.max_submissions,
-            "submissions_remaining": self.max_submissions - self.submission_count,
+            "submissions_remaining": self.max_submissions - submission_number,
         }
 
 
@@ -1,9 +1,30 @@
-from datetime import datetime
-import json
-import PyPDF2
+import hashlib
+import io
+import multiprocessing
+import os
 import re
-from typing import Callable, Awaitable, Any
-import logging
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from logger import get_logger
+
+try:
+    # optional, google-re2 matches in linear time regardless of the input
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    # optional, Hyperscan matches all patterns in one SIMD-accelerated pass
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+utils_logger = get_logger(__name__)
 
 INSTRUCTIONS_PROMPT = """
 You will solve programming problems from the IOI competition.
@@ -28,77 +49,313 @@ def _merge_statistics(metadata: dict) -> dict:
     """
     Merge turn-level statistics into session-level statistics.
 
+    Token usage, tool usage, error and API call counts and the duration are kept
+    up to date by the agent during the run, so only each turn's TurnMetadata is
+    converted to a plain dict here.
+
     Args:
         metadata (dict): The metadata with turn-level statistics
 
     Returns:
         dict: Updated metadata with merged statistics
     """
-    # Reset aggregate values to recalculate
-    metadata["total_tokens"] = {
-        "prompt_tokens": 0,
-        "completion_tokens": 0,
-        "total_tokens": 0,
-    }
-    metadata["tool_usage"] = {}
-    metadata["tool_calls_count"] = 0
-    metadata["api_calls_count"] = len(metadata["turns"])
-    metadata["error_count"] = 0
-
-    # Aggregate statistics from all turns
-    for turn in metadata["turns"]:
-        # Aggregate token usage
-        in_tokens = turn["in_tokens"]
-        out_tokens = turn["out_tokens"]
-        metadata["total_tokens"]["prompt_tokens"] += in_tokens
-        metadata["total_tokens"]["completion_tokens"] += out_tokens
-        metadata["total_tokens"]["total_tokens"] += in_tokens + out_tokens
-
-        # Count errors
-        metadata["error_count"] += len(turn["errors"])
-
-        # Aggregate tool usage
-        for tool_call in turn["tool_calls"]:
-            tool_name = tool_call["tool_name"]
-            if tool_name not in metadata["tool_usage"]:
-                metadata["tool_usage"][tool_name] = 0
-            metadata["tool_usage"][tool_name] += 1
-            metadata["tool_calls_count"] += 1
-
-    # Calculate total duration
-    if metadata["start_time"] and metadata["end_time"]:
-        start = datetime.fromisoformat(metadata["start_time"])
-        end = datetime.fromisoformat(metadata["end_time"])
-        metadata["total_duration_seconds"] = (end - start).total_seconds()
+    metadata["turns"] = [turn.to_dict() for turn in metadata["turns"]]
 
     return metadata
 
+# MuPDF is not thread-safe, documents may only be opened and parsed by one thread at a time
+_PYMUPDF_LOCK = threading.Lock()
+
+# the same holds for PDFium
+_PDFIUM_LOCK = threading.Lock()
+
+# extracted PDF text by cache key (see _pdf_cache_key), so each PDF is only parsed once per process
+_PDF_CACHE: dict[str, str] = {}
+
+# extracted PDF text is also kept on disk, so repeated runs skip parsing entirely
+PDF_TEXT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ioi_agent", "pdf_text"
+)
+
+# a fenced code block: a line starting with a fence (and an optional language tag) up to the
+# next line starting with a fence. Fences inside a line, e.g. in prose, are ignored
+_CODE_BLOCK_RE = re.compile(r"^[ \t]*```[^\n]*\n(.*?)^[ \t]*```", re.MULTILINE | re.DOTALL)
+
 def simple_extract_code(model_output: str):
     """
     Extract code from model output by finding the last code block between triple backticks.
-    
+
+    Only fences at the start of a line (after optional indentation) open or close a block, and
+    blocks are paired from the start of the output, so a stray fence cannot shift the result.
+    If no such block exists, the lines between the last two lines containing a fence are used.
+
     Args:
         model_output (str): The model output containing code blocks
         
     Returns:
         str: The extracted code or empty string if no valid code block found
     """
-    outputlines = model_output.split("\n")
-    indexlines = [i for i, line in enumerate(outputlines) if "```" in line]
-    if len(indexlines) < 2:
+    # fast path for the common single block, two fences each starting a line
+    if model_output.count("```") == 2:
+        start = model_output.find("```")
+        end = model_output.rfind("```")
+        start_line_end = model_output.find("\n", start)
+        end_line_start = model_output.rfind("\n", 0, end) + 1
+        if (
+            0 <= start_line_end < end
+            and not model_output[model_output.rfind("\n", 0, start) + 1 : start].strip(" \t")
+            and not model_output[end_line_start:end].strip(" \t")
+        ):
+            return model_output[start_line_end + 1 : end_line_start - 1]
+
+    # the deque drains the iterator in C and keeps only the last block
+    last = deque(_CODE_BLOCK_RE.finditer(model_output), maxlen=1)
+    if not last:
+        # no block opens at the start of a line, eg. "Here it is: ```cpp"
+        return _extract_between_last_fences(model_output)
+    # the block ends with the newline before the closing fence, unless it is empty
+    return last[0].group(1)[:-1]
+
+def _extract_between_last_fences(model_output: str) -> str:
+    # the lines between the last two lines containing a fence, wherever the fences are in their line
+    end = model_output.rfind("```")
+    if end < 0:
+        return ""
+    end_line_start = model_output.rfind("\n", 0, end) + 1
+    start = model_output.rfind("```", 0, end_line_start)
+    if start < 0:
         return ""
-    # return "\n".join(outputlines[indexlines[0] + 1 : indexlines[1]])
-    return "\n".join(outputlines[indexlines[-2] + 1 : indexlines[-1]])
+    start_line_end = model_output.find("\n", start)
+    return model_output[start_line_end + 1 : end_line_start - 1]
 
 def extract_text_from_pdf(pdf_path: str) -> str:
-    text = ""
-    with open(pdf_path, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text.strip()
+    """
+    Extract the text of a PDF with PyMuPDF, falling back to pypdfium2 and then pypdf if it fails.
+    The PDF_BACKEND environment variable (pymupdf, pypdfium2 or pypdf) selects another backend to try first.
+
+    The result is cached in memory and in PDF_TEXT_CACHE_DIR, keyed by the file's path,
+    modification time and size.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+
+    Returns:
+        str: The extracted text
+    """
+    key = _pdf_cache_key(pdf_path)
+    text = _PDF_CACHE.get(key)
+    if text is not None:
+        return text
+
+    cache_path = os.path.join(PDF_TEXT_CACHE_DIR, key[:2], key + ".txt")
+    try:
+        with open(cache_path, encoding="utf-8", newline="") as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError):
+        with open(pdf_path, "rb") as f:
+            data = f.read()
+        # each backend is tried in turn, the error of the last one is raised to the caller
+        *fallible, last = _PDF_BACKENDS
+        for extract in fallible:
+            try:
+                text = extract(data)
+                break
+            except Exception:
+                continue
+        else:
+            text = last(data)
+        _write_pdf_text_cache(cache_path, text)
+    _PDF_CACHE[key] = text
+    return text
+
+def _pdf_cache_key(pdf_path: str) -> str:
+    # stat only, the PDF itself is not read on a cache hit. The backend is part of the key
+    # because backends extract slightly different text
+    st = os.stat(pdf_path)
+    ident = f"{os.path.abspath(pdf_path)}|{st.st_mtime_ns}|{st.st_size}|{_PDF_BACKEND}"
+    return hashlib.blake2b(ident.encode(), digest_size=16).hexdigest()
+
+def _write_pdf_text_cache(cache_path: str, text: str):
+    # written to a temporary file and renamed, so concurrent readers never see a partial file.
+    # The cache is only an optimization, failing to write it is not an error
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except (OSError, UnicodeEncodeError):
+        pass
+
+def extract_text_from_pdfs(pdf_paths: list[str], workers: int | None = None) -> dict[str, str]:
+    """
+    Extract the text of several PDFs in parallel, one worker process per file at a time.
+
+    The results are added to the in-process cache, so later calls to extract_text_from_pdf for
+    the same files return immediately. PDFs that are already cached are not sent to the workers.
+
+    Args:
+        pdf_paths (list[str]): Paths to the PDF files
+        workers (int | None): Number of worker processes, defaults to the number of CPUs
+
+    Returns:
+        dict[str, str]: The extracted text by path. PDFs that failed to extract, or were not
+            extracted because a worker process died, are left out
+    """
+    texts = {}
+    pending = {}
+    for pdf_path in pdf_paths:
+        try:
+            key = _pdf_cache_key(pdf_path)
+        except OSError:
+            continue
+        if key in _PDF_CACHE:
+            texts[pdf_path] = _PDF_CACHE[key]
+        else:
+            pending[pdf_path] = key
+    if not pending:
+        return texts
+
+    # MuPDF and PDFium only parse one document at a time per process, so files are spread
+    # over processes instead of threads
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    # workers come from a fork server rather than forking this process, whose threads (logging
+    # listeners, callers holding the PDF locks) could leave a lock held forever in the child
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver")) as executor:
+            for (pdf_path, key), text in zip(pending.items(), executor.map(_extract_text_or_none, pending)):
+                if text is not None:
+                    _PDF_CACHE[key] = text
+                    texts[pdf_path] = text
+    except (BrokenProcessPool, OSError) as e:
+        # a worker died (eg. MuPDF crashed on a corrupt PDF) or the pool could not start. The PDFs
+        # not extracted yet are left to extract_text_from_pdf, parsing them here could crash this process
+        uncached = sum(pdf_path not in texts for pdf_path in pending)
+        utils_logger.warning("PDF extraction workers failed, %d of %d PDFs left uncached: %r", uncached, len(pending), e)
+    return texts
+
+def _extract_text_or_none(pdf_path: str) -> str | None:
+    # runs in a worker process, one broken PDF must not fail the whole batch
+    try:
+        return extract_text_from_pdf(pdf_path)
+    except Exception:
+        return None
+
+def _extract_text_with_pymupdf(data: bytes) -> str:
+    # imported on first use so importing utils (and the agent) does not pay for it
+    import pymupdf
+
+    # plain "text" extraction streams the pages without any layout analysis
+    with _PYMUPDF_LOCK, pymupdf.open(stream=data, filetype="pdf") as doc:
+        return "\n".join(page.get_text("text") for page in doc).strip()
+
+def _extract_text_with_pypdfium2(data: bytes) -> str:
+    # optional, raises ImportError when pypdfium2 is not installed
+    import pypdfium2
+
+    parts = []
+    with _PDFIUM_LOCK:
+        pdf = pypdfium2.PdfDocument(data)
+        try:
+            for page in pdf:
+                # text pages and pages hold native memory, release them as soon as they are read
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+    # PDFium ends lines with \r\n, normalized to match the other backends
+    return "\n".join(part for part in parts if part).replace("\r\n", "\n").strip()
+
+def _extract_text_with_pypdf(data: bytes) -> str:
+    # pages share the reader's stream, so they are extracted one after the other
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    return "\n".join(page_text for page in reader.pages if (page_text := page.extract_text())).strip()
+
+# PDF text extractors by name, in their default order. pypdf is the maintained successor of PyPDF2
+_PDF_EXTRACTORS: dict[str, Callable[[bytes], str]] = {
+    "pymupdf": _extract_text_with_pymupdf,
+    "pypdfium2": _extract_text_with_pypdfium2,
+    "pypdf": _extract_text_with_pypdf,
+    "pypdf2": _extract_text_with_pypdf,
+}
+
+# the PDF_BACKEND environment variable picks the extractor tried first, the others stay fallbacks.
+# An unknown value only warns, runs that never read a PDF must not fail on it
+_PDF_BACKEND = (os.environ.get("PDF_BACKEND") or "pymupdf").lower()
+if _PDF_BACKEND not in _PDF_EXTRACTORS:
+    utils_logger.warning(
+        "Unknown PDF_BACKEND %r, expected one of %s. Using pymupdf", _PDF_BACKEND, ", ".join(_PDF_EXTRACTORS)
+    )
+    _PDF_BACKEND = "pymupdf"
+
+# PDF text extractors in the order they are tried
+_PDF_BACKENDS: tuple[Callable[[bytes], str], ...] = tuple(
+    dict.fromkeys((_PDF_EXTRACTORS[_PDF_BACKEND], *_PDF_EXTRACTORS.values()))
+)
+
+# Common compilation error indicators, each with a lowercase literal that every match contains
+_COMPILATION_ERROR_PATTERNS = [
+    ('compilation failed', r'compilation failed'),
+    ('error:', r'error:.*\berror\b'),  # C++ compiler errors usually contain "error:"
+    ('fatal error:', r'fatal error:'),
+    ('undefined reference', r'undefined reference'),
+    ('cannot find -l', r'cannot find -l'),  # linking errors
+    ('ld returned', r'ld returned.*exit status'),  # linker errors
+    ('collect2:', r'collect2:.*error:'),  # GCC collect2 errors
+    ('make', r'make.*\[.*\].*Error'),  # Make errors
+    ('g++', r'g\+\+.*error'),  # G++ specific errors
+    ('clang', r'clang.*error'),  # Clang specific errors
+]
+
+# the linear-time engines take the patterns as they are. With backtracking re, "error:.*\berror\b"
+# is quadratic on a long line with many "error:" and no match, so re commits to the first "error:"
+# of each line with an atomic group instead, which matches exactly the same lines
+_RE_PATTERNS = {
+    r'error:.*\berror\b': r'(?m:^)(?>[^\n]*?error:)[^\n]*\berror\b',
+}
+
+# the patterns checked one by one behind their literals, patterns that are just their literal
+# need no regex at all. re.ASCII gives re the same case folding and \b as RE2 and Hyperscan
+_COMPILE_ERR_CHECKS = [
+    (
+        literal,
+        None if pattern == literal else re.compile(_RE_PATTERNS.get(pattern, pattern), re.IGNORECASE | re.ASCII),
+    )
+    for literal, pattern in _COMPILATION_ERROR_PATTERNS
+]
+
+# with google-re2 installed, the patterns are matched by a single RE2 set in one linear pass
+_COMPILE_ERR_SET = None
+if re2 is not None:
+    _re2_options = re2.Options()
+    _re2_options.case_sensitive = False
+    _COMPILE_ERR_SET = re2.Set.SearchSet(_re2_options)
+    for _, _pattern in _COMPILATION_ERROR_PATTERNS:
+        _COMPILE_ERR_SET.Add(_pattern)
+    _COMPILE_ERR_SET.Compile()
+
+# with Hyperscan installed, all patterns are compiled into one database which takes precedence
+# over RE2
+_COMPILE_ERR_DB = None
+if hyperscan is not None:
+    _COMPILE_ERR_DB = hyperscan.Database()
+    _COMPILE_ERR_DB.compile(
+        expressions=[pattern.encode() for _, pattern in _COMPILATION_ERROR_PATTERNS],
+        ids=list(range(len(_COMPILATION_ERROR_PATTERNS))),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(_COMPILATION_ERROR_PATTERNS),
+    )
+
+# Hyperscan scratch space can only be used by one scan at a time, so each thread gets its own
+_HS_SCRATCH = threading.local()
 
 def has_compilation_error(stdout: str, stderr: str) -> bool:
     """
@@ -111,26 +368,41 @@ def has_compilation_error(stdout: str, stderr: str) -> bool:
     Returns:
         bool: True if compilation errors are detected, False otherwise
     """
-    # Common compilation error indicators
-    compilation_error_patterns = [
-        r'compilation failed',
-        r'error:.*\berror\b',  # C++ compiler errors usually contain "error:"
-        r'fatal error:',
-        r'undefined reference',
-        r'cannot find -l',  # linking errors
-        r'ld returned.*exit status',  # linker errors
-        r'collect2:.*error:',  # GCC collect2 errors
-        r'make.*\[.*\].*Error',  # Make errors
-        r'g\+\+.*error',  # G++ specific errors
-        r'clang.*error',  # Clang specific errors
-    ]
-    
-    combined_output = stdout + "\n" + stderr
-    combined_output_lower = combined_output.lower()
-    
-    for pattern in compilation_error_patterns:
-        if re.search(pattern, combined_output_lower, re.IGNORECASE):
-            return True
-            
+    # none of the patterns match across lines, so both outputs are searched separately
+    # instead of building a joined copy
+    return _has_compilation_error(stdout) or _has_compilation_error(stderr)
+
+def _has_compilation_error(output: str) -> bool:
+    # the engines differ in case folding and \b outside ASCII, so the optional ones only get ASCII
+    # output, where all of them agree, and everything else goes to re with ASCII semantics.
+    # The result never depends on which modules are installed
+    if output.isascii():
+        if _COMPILE_ERR_DB is not None:
+            return _scan_compilation_error(output)
+        if _COMPILE_ERR_SET is not None:
+            return bool(_COMPILE_ERR_SET.Match(output))
+    return _search_compilation_error(output)
+
+def _scan_compilation_error(output: str) -> bool:
+    scratch = getattr(_HS_SCRATCH, "scratch", None)
+    if scratch is None:
+        scratch = _HS_SCRATCH.scratch = hyperscan.Scratch(_COMPILE_ERR_DB)
+    try:
+        # the handler stops the scan at the first match, which surfaces as ScanTerminated
+        _COMPILE_ERR_DB.scan(output.encode(), match_event_handler=_stop_scan, scratch=scratch)
+    except hyperscan.ScanTerminated:
+        return True
     return False
 
+def _stop_scan(pattern_id, start, end, flags, context) -> bool:
+    return True
+
+def _search_compilation_error(output: str) -> bool:
+    # substring tests are far cheaper than the regex, which most successful runs never match,
+    # so each pattern is only searched for when its literal occurs in the output. With ASCII
+    # semantics a match's literal is ASCII text, which lower() always keeps as a lowercase substring
+    lowered = output.lower()
+    return any(
+        literal in lowered and (regex is None or regex.search(output) is not None)
+        for literal, regex in _COMPILE_ERR_CHECKS
+    )